@@ -1,4 +1,5 @@
 import collections
+import itertools
 import sys
 
 import typing
@@ -8,6 +9,19 @@ try:
 except ImportError:
     from scandir import scandir
 
+try:
+    from itertools import batched
+except ImportError:
+    # Python < 3.12
+    def batched(iterable: typing.Iterable[typing.Any], n: int) -> typing.Iterator[tuple]:
+        """Batch data from the iterable into tuples of length n. The last batch may be shorter."""
+        it = iter(iterable)
+        while True:
+            chunk = tuple(itertools.islice(it, n))
+            if not chunk:
+                return
+            yield chunk
+
 
 # https://pypi.org/project/asyncio_utils/
 
@@ -333,7 +333,7 @@ class CaptionFormatter(Formatter):
             return obj, first
         except (TypeError, AttributeError, KeyError, ValueError) as e:
             # Log the specific error for debugging, but return placeholder
-            logger.debug(f'Failed to parse field "{field_name}": {type(e).__name__}: {e}')
+            logger.debug('Failed to parse field "%s": %s: %s', field_name, type(e).__name__, e)
             first, rest = _string.formatter_field_name_split(field_name)
             return '{' + field_name + '}', first
 
@@ -0,0 +1,148 @@
+from typing import TYPE_CHECKING, Dict, List
+
+import click
+from telethon.errors import RPCError, InvalidBufferError
+from telethon.network import MTProtoSender
+from telethon.tl import functions
+from telethon.tl.alltlobjects import LAYER
+
+if TYPE_CHECKING:
+    from telethon import TelegramClient
+
+
+class SenderPool:
+    """
+    Extra senders kept connected between the uploads of several files, by data center. Opening
+    the connections and initializing their sessions for every file would wait several round
+    trips before each upload. A sender is used by only one upload at the same time.
+    """
+
+    def __init__(self):
+        self.senders: Dict[int, List[MTProtoSender]] = {}
+
+    def acquire(self, dc_id: int, count: int) -> List[MTProtoSender]:
+        """
+        Take up to count connected senders. The senders disconnected while they were idle are
+        discarded.
+
+        :param dc_id: Data center of the senders.
+        :param count: Maximum number of senders.
+        :return: Senders taken from the pool
+        """
+        idle = self.senders.get(dc_id, [])
+        senders = []
+        while idle and len(senders) < count:
+            sender = idle.pop()
+            if sender.is_connected():
+                senders.append(sender)
+        return senders
+
+    def release(self, dc_id: int, senders: List[MTProtoSender]) -> None:
+        """
+        Return the senders to the pool to be used by the next uploads.
+
+        :param dc_id: Data center of the senders.
+        :param senders: Senders taken using :meth:`acquire` or created for the data center.
+        :return: None
+        """
+        self.senders.setdefault(dc_id, []).extend(senders)
+
+    async def close(self, client: 'TelegramClient') -> None:
+        """
+        Disconnect all the senders and destroy their sessions in the Telegram servers. The
+        sessions are destroyed using the connection of the client, so this must be called
+        before disconnecting the client.
+
+        :param client: Client of the senders.
+        :return: None
+        """
+        senders, self.senders = self.senders, {}
+        for sender in (sender for dc_senders in senders.values() for sender in dc_senders):
+            session_id = sender._state.id
+            await sender.disconnect()
+            try:
+                await client(functions.DestroySessionRequest(session_id))
+            except (ConnectionError, RPCError):
+                pass
+
+
+class ParallelTransferrer:
+    """
+    Extra MTProto connections to the data center of the client. Each connection has its own
+    TCP socket, so the file parts sent using different senders are uploaded in parallel
+    instead of being serialized in the connection of the client.
+    """
+
+    def __init__(self, client: 'TelegramClient', max_senders: int, pool: SenderPool):
+        """
+        :param client: Connected Telegram client. Its session auth key is shared by the senders.
+        :param max_senders: Number of senders to use, including the sender of the client.
+        :param pool: Pool with the senders kept between uploads.
+        """
+        self.client = client
+        self.max_senders = max(1, max_senders)
+        self.pool = pool
+        self.dc_id = None
+        self.senders: List[MTProtoSender] = [client._sender]
+        self.extra_senders: List[MTProtoSender] = []
+
+    async def _create_sender(self) -> MTProtoSender:
+        """
+        Create a new sender connected to the data center of the client. The file parts are
+        uploaded to the same data center of the session, so the auth key of the session is
+        reused and it is not necessary to export the authorization.
+
+        :return: Connected sender
+        """
+        session = self.client.session
+        sender = MTProtoSender(session.auth_key, loggers=self.client._log)
+        await sender.connect(self.client._connection(
+            session.server_address,
+            session.port,
+            session.dc_id,
+            loggers=self.client._log,
+            proxy=self.client._proxy,
+            local_addr=self.client._local_addr,
+        ))
+        # A new MTProto session is created for the new connection
+        self.client._init_request.query = functions.help.GetConfigRequest()
+        try:
+            await sender.send(functions.InvokeWithLayerRequest(LAYER, self.client._init_request))
+        except BaseException:
+            await sender.disconnect()
+            raise
+        return sender
+
+    async def init_upload(self) -> List[MTProtoSender]:
+        """
+        Take the extra senders from the pool and connect the missing ones. If Telegram refuses
+        new connections, the senders already connected are used.
+
+        :return: Senders to use in the upload, including the sender of the client.
+        """
+        if self.max_senders > 1:
+            self.dc_id = self.client.session.dc_id
+            self.extra_senders = self.pool.acquire(self.dc_id, self.max_senders - 1)
+            self.senders.extend(self.extra_senders)
+        while len(self.senders) < self.max_senders:
+            try:
+                sender = await self._create_sender()
+            except (ConnectionError, InvalidBufferError, RPCError) as e:
+                click.echo(f'Could not open a new connection to Telegram servers: {e}. '
+                           f'Using {len(self.senders)} connections.', err=True)
+                break
+            self.extra_senders.append(sender)
+            self.senders.append(sender)
+        return self.senders
+
+    def close(self) -> None:
+        """
+        Return the extra senders to the pool. They are disconnected when the client is
+        disconnected.
+
+        :return: None
+        """
+        if self.extra_senders:
+            self.pool.release(self.dc_id, self.extra_senders)
+        self.extra_senders = []
+        self.senders = [self.client._sender]
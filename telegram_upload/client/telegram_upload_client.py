@@ -2,34 +2,54 @@ import asyncio
 import hashlib
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterable, Optional
 
 import click
 from telethon import TelegramClient, utils, helpers, custom
 from telethon.crypto import AES
 from telethon.errors import RPCError, FloodWaitError, InvalidBufferError
+from telethon.network import MTProtoSender
 from telethon.tl import types, functions, TLRequest
 from telethon.utils import pack_bot_file_id
 
+from telegram_upload.client.parallel_transferrer import ParallelTransferrer, SenderPool
 from telegram_upload.client.progress_bar import get_progress_bar
 from telegram_upload.exceptions import TelegramUploadDataLoss, MissingFileError
 from telegram_upload.upload_files import File
 from telegram_upload.utils import grouper, async_to_sync, get_environment_integer
 
 PARALLEL_UPLOAD_BLOCKS = get_environment_integer('TELEGRAM_UPLOAD_PARALLEL_UPLOAD_BLOCKS', 4)
+PARALLEL_UPLOAD_SENDERS = get_environment_integer('TELEGRAM_UPLOAD_PARALLEL_UPLOAD_SENDERS', 1)
 ALBUM_FILES = 10
 RETRIES = 3
 MAX_RECONNECT_RETRIES = get_environment_integer('TELEGRAM_UPLOAD_MAX_RECONNECT_RETRIES', 5)
 RECONNECT_TIMEOUT = get_environment_integer('TELEGRAM_UPLOAD_RECONNECT_TIMEOUT', 5)
 MIN_RECONNECT_WAIT = get_environment_integer('TELEGRAM_UPLOAD_MIN_RECONNECT_WAIT', 2)
+MD5_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def update_md5(hash_md5, parts: Iterable[bytes]) -> None:
+    """
+    Update the MD5 hash with several parts in order. Used to hash the parts in a single executor call.
+
+    :param hash_md5: hashlib MD5 hash object.
+    :param parts: Parts of the file in order.
+    :return: None
+    """
+    for part in parts:
+        hash_md5.update(part)
 
 
 class TelegramUploadClient(TelegramClient):
     parallel_upload_blocks = PARALLEL_UPLOAD_BLOCKS
+    parallel_upload_senders = PARALLEL_UPLOAD_SENDERS
 
     def __init__(self, *args, **kwargs):
         self.reconnecting_lock = asyncio.Lock()
         self.upload_semaphore = asyncio.Semaphore(self.parallel_upload_blocks)
+        # Extra connections used to upload the files, kept between uploads
+        self.upload_sender_pool = SenderPool()
         super().__init__(*args, **kwargs)
 
     def forward_to(self, message, destinations):
@@ -171,7 +191,8 @@ class TelegramUploadClient(TelegramClient):
             use_cache: type = None,
             key: bytes = None,
             iv: bytes = None,
-            progress_callback: 'hints.ProgressCallback' = None) -> 'types.TypeInputFile':
+            progress_callback: 'hints.ProgressCallback' = None,
+            skip_md5: bool = False) -> 'types.TypeInputFile':
         """
         Uploads a file to Telegram's servers, without sending it.
 
@@ -232,6 +253,12 @@ class TelegramUploadClient(TelegramClient):
                 within a file (e.g. ``2.5`` means it has sent 50% of the third
                 file, because it's between 2 and 3).
 
+            skip_md5 (`bool`, optional):
+                Do not calculate the MD5 checksum of small files (up to 10MB).
+                Telegram does not verify the file when the checksum is empty.
+                Useful if the file is already verified by the caller. Big
+                files never use the checksum.
+
         Returns
             :tl:`InputFileBig` if the file size is larger than 10MB,
             `InputSizedFile <telethon.tl.custom.inputsizedfile.InputSizedFile>`
@@ -285,72 +312,172 @@ class TelegramUploadClient(TelegramClient):
             # Determine whether the file is too big (over 10MB) or not
             # Telegram does make a distinction between smaller or larger files
             is_big = file_size > 10 * 1024 * 1024
+            # Bit odd that MD5 is only needed for small files and not
+            # big ones with more chance for corruption, but that's
+            # what Telegram wants.
+            use_md5 = not is_big and not skip_md5
             hash_md5 = hashlib.md5()
 
             part_count = (file_size + part_size - 1) // part_size
             self._log[__name__].info('Uploading file of %d bytes in %d chunks of %d',
                                     file_size, part_count, part_size)
 
-            pos = 0
-            for part_index in range(part_count):
-                # Read the file by in chunks of size part_size
-                part = await helpers._maybe_await(stream.read(part_size))
-
-                if not isinstance(part, bytes):
-                    raise TypeError(
-                        'file descriptor returned {}, not bytes (you must '
-                        'open the file in bytes mode)'.format(type(part)))
-
-                # `file_size` could be wrong in which case `part` may not be
-                # `part_size` before reaching the end.
-                if len(part) != part_size and part_index < part_count - 1:
-                    raise ValueError(
-                        'read less than {} before reaching the end; either '
-                        '`file_size` or `read` are wrong'.format(part_size))
-
-                pos += len(part)
-
-                # Encryption part if needed
-                if key and iv:
-                    part = AES.encrypt_ige(part, key, iv)
-
-                if not is_big:
-                    # Bit odd that MD5 is only needed for small files and not
-                    # big ones with more chance for corruption, but that's
-                    # what Telegram wants.
-                    hash_md5.update(part)
-
-                # The SavePartRequest is different depending on whether
-                # the file is too large or not (over or less than 10MB)
-                if is_big:
-                    request = functions.upload.SaveBigFilePartRequest(
-                        file_id, part_index, part_count, part)
-                else:
-                    request = functions.upload.SaveFilePartRequest(
-                        file_id, part_index, part)
-                await self.upload_semaphore.acquire()
-                self.loop.create_task(
-                    self._send_file_part(request, part_index, part_count, pos, file_size, progress_callback),
-                    name=f"telegram-upload-file-{part_index}"
+            # The upload is a pipeline of three stages connected by queues: the parts are read
+            # from the disk, encrypted and hashed, and submitted to Telegram. The stages run at
+            # the same time, so a slow disk does not stop the uploads and vice versa. The queues
+            # limit the parts in memory.
+            read_queue = asyncio.Queue(maxsize=self.parallel_upload_blocks)
+            send_queue = asyncio.Queue(maxsize=self.parallel_upload_blocks)
+            # Single worker executors keep the operations in the same order as the parts while
+            # they are executed outside the event loop thread.
+            read_executor = ThreadPoolExecutor(max_workers=1)
+            encrypt_executor = ThreadPoolExecutor(max_workers=1)
+            md5_executor = ThreadPoolExecutor(max_workers=1)
+            md5_futures = []
+            # The parts are distributed between several connections to the data center
+            transferrer = ParallelTransferrer(self, self.parallel_upload_senders, self.upload_sender_pool)
+
+            # The names used for every part are bound to locals before the stages start
+            run_in_executor = self.loop.run_in_executor
+            maybe_await = helpers._maybe_await
+            encrypt = AES.encrypt_ige if key and iv else None
+            md5_block_size = MD5_BLOCK_SIZE
+
+            async def read_parts():
+                read = stream.read
+                put = read_queue.put
+                pos = 0
+                for part_index in range(part_count):
+                    # Read the file by in chunks of size part_size
+                    part = await maybe_await(await run_in_executor(read_executor, read, part_size))
+
+                    if not isinstance(part, bytes):
+                        raise TypeError(
+                            'file descriptor returned {}, not bytes (you must '
+                            'open the file in bytes mode)'.format(type(part)))
+
+                    # `file_size` could be wrong in which case `part` may not be
+                    # `part_size` before reaching the end.
+                    if len(part) != part_size and part_index < part_count - 1:
+                        raise ValueError(
+                            'read less than {} before reaching the end; either '
+                            '`file_size` or `read` are wrong'.format(part_size))
+
+                    pos += len(part)
+                    await put((part_index, pos, part))
+                await put(None)
+
+            async def encrypt_parts():
+                # The parts are hashed in blocks of MD5_BLOCK_SIZE to reduce the calls to the executor
+                md5_parts = []
+                md5_parts_size = 0
+                get = read_queue.get
+                put = send_queue.put
+                while True:
+                    item = await get()
+                    if item is None:
+                        break
+                    part_index, pos, part = item
+
+                    # Encryption part if needed
+                    if encrypt:
+                        part = await run_in_executor(encrypt_executor, encrypt, part, key, iv)
+
+                    if use_md5:
+                        md5_parts.append(part)
+                        md5_parts_size += len(part)
+                        if md5_parts_size >= md5_block_size:
+                            md5_futures.append(run_in_executor(md5_executor, update_md5, hash_md5, md5_parts))
+                            md5_parts = []
+                            md5_parts_size = 0
+                    await put((part_index, pos, part))
+                if md5_parts:
+                    md5_futures.append(run_in_executor(md5_executor, update_md5, hash_md5, md5_parts))
+                await put(None)
+
+            # The SavePartRequest is different depending on whether
+            # the file is too large or not (over or less than 10MB)
+            if is_big:
+                save_big_file_part_request = functions.upload.SaveBigFilePartRequest
+
+                def get_part_request(part_index: int, part: bytes) -> TLRequest:
+                    return save_big_file_part_request(file_id, part_index, part_count, part)
+            else:
+                save_file_part_request = functions.upload.SaveFilePartRequest
+
+                def get_part_request(part_index: int, part: bytes) -> TLRequest:
+                    return save_file_part_request(file_id, part_index, part)
+
+            async def send_parts(sender: MTProtoSender):
+                # Each worker uploads its parts in sequence using its own sender. The workers
+                # take the parts from the same queue, so a slow connection does not delay others.
+                # Telethon packs the parts sent at the same time using a sender in containers.
+                get = send_queue.get
+                upload_semaphore = self.upload_semaphore
+                send_file_part = self._send_file_part
+                client_sender = self._sender
+                while True:
+                    item = await get()
+                    if item is None:
+                        # Let the other workers know that there are no more parts
+                        await send_queue.put(None)
+                        break
+                    part_index, pos, part = item
+                    await upload_semaphore.acquire()
+                    # The slot is released even if the upload fails or the worker is cancelled.
+                    # The semaphore is shared by all the uploads of the client.
+                    try:
+                        if sender is not client_sender and not sender.is_connected():
+                            # The extra connection was lost. The failed parts are retried using
+                            # the connection of the client, so the next ones are sent using it too.
+                            sender = client_sender
+                        await send_file_part(get_part_request(part_index, part), part_index, part_count, pos,
+                                             file_size, progress_callback, sender=sender)
+                    finally:
+                        upload_semaphore.release()
+
+            stages = []
+            try:
+                senders = await transferrer.init_upload()
+                stages = [self.loop.create_task(read_parts()), self.loop.create_task(encrypt_parts())]
+                workers = max(self.parallel_upload_blocks, len(senders))
+                stages.extend(
+                    self.loop.create_task(send_parts(senders[worker % len(senders)]),
+                                          name=f"telegram-upload-file-{worker}")
+                    for worker in range(workers)
                 )
-            # Wait for all tasks to finish
-            await asyncio.wait([
-                task for task in asyncio.all_tasks() if task.get_name().startswith(f"telegram-upload-file-")
-            ])
+                await asyncio.gather(*stages)
+                await asyncio.gather(*md5_futures)
+            finally:
+                # Stop the other stages if one of them failed
+                for stage in stages:
+                    stage.cancel()
+                await asyncio.gather(*stages, return_exceptions=True)
+                # Wait for a pending read so that the stream is not closed while it is in use
+                read_executor.shutdown(wait=True)
+                encrypt_executor.shutdown(wait=False)
+                md5_executor.shutdown(wait=False)
+                transferrer.close()
         if is_big:
             return types.InputFileBig(file_id, part_count, file_name)
         else:
-            return custom.InputSizedFile(
+            input_file = custom.InputSizedFile(
                 file_id, part_count, file_name, md5=hash_md5, size=file_size
             )
+            if not use_md5:
+                # An empty checksum is not verified by Telegram
+                input_file.md5_checksum = ''
+                input_file.md5 = b''
+            return input_file
 
     # endregion
 
     async def _send_file_part(self, request: TLRequest, part_index: int, part_count: int, pos: int, file_size: int,
-                              progress_callback: Optional['hints.ProgressCallback'] = None, retry: int = 0) -> None:
+                              progress_callback: Optional['hints.ProgressCallback'] = None, retry: int = 0,
+                              sender: Optional[MTProtoSender] = None) -> None:
         """
-        Submit the file request part to Telegram. This method waits for the request to be executed, logs the upload,
-        and releases the semaphore to allow further uploading.
+        Submit the file request part to Telegram. This method waits for the request to be executed and logs the
+        upload. The slot of the part in the upload semaphore is released by the caller.
 
         :param request: SaveBigFilePartRequest or SaveFilePartRequest. This request will be awaited.
         :param part_index: Part index as integer. Used in logging.
@@ -358,11 +485,13 @@ class TelegramUploadClient(TelegramClient):
         :param pos: Number of part as integer. Used for progress bar.
         :param file_size: Total file size. Used for progress bar.
         :param progress_callback: Callback to use after submit the request. Optional.
+        :param retry: Number of retries already made.
+        :param sender: Sender used to submit the request. By default the sender of the client. Optional.
         :return: None
         """
         result = None
         try:
-            result = await self(request)
+            result = await self._call(sender or self._sender, request)
         except InvalidBufferError as e:
             if e.code == 429:
                 # Too many connections
@@ -372,24 +501,42 @@ class TelegramUploadClient(TelegramClient):
         except ConnectionError:
             # Retry to send the file part
             click.echo(f'Detected connection error. Retrying...', err=True)
-        else:
-            self.upload_semaphore.release()
         if result is None and retry < MAX_RECONNECT_RETRIES:
-            # An error occurred, retry
+            # An error occurred, retry using the connection of the client
             await asyncio.sleep(max(MIN_RECONNECT_WAIT, retry * MIN_RECONNECT_WAIT))
             await self.reconnect()
             await self._send_file_part(
                 request, part_index, part_count, pos, file_size, progress_callback, retry + 1
             )
         elif result:
-            self._log[__name__].debug('Uploaded %d/%d',
-                                      part_index + 1, part_count)
-            if progress_callback:
-                await helpers._maybe_await(progress_callback(pos, file_size))
+            await self._file_part_uploaded(part_index, part_count, pos, file_size, progress_callback)
         else:
             raise RuntimeError(
                 'Failed to upload file part {}.'.format(part_index))
 
+    async def _file_part_uploaded(self, part_index: int, part_count: int, pos: int, file_size: int,
+                                  progress_callback: Optional['hints.ProgressCallback'] = None) -> None:
+        """
+        Log an uploaded file part and update the progress.
+
+        :param part_index: Part index as integer. Used in logging.
+        :param part_count: Total parts count as integer. Used in logging.
+        :param pos: Number of part as integer. Used for progress bar.
+        :param file_size: Total file size. Used for progress bar.
+        :param progress_callback: Callback to use after submit the request. Optional.
+        :return: None
+        """
+        self._log[__name__].debug('Uploaded %d/%d',
+                                  part_index + 1, part_count)
+        if progress_callback:
+            await helpers._maybe_await(progress_callback(pos, file_size))
+
+    async def _disconnect_coro(self):
+        # The sessions of the extra connections are destroyed using the connection of the client
+        if self.session is not None:
+            await self.upload_sender_pool.close(self)
+        await super()._disconnect_coro()
+
     def decrease_upload_semaphore(self):
         """
         Decreases the upload semaphore by one. This method is used to reduce the number of parallel uploads.
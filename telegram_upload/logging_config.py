@@ -7,6 +7,7 @@ levels and formatting.
 import logging
 import os
 import sys
+from functools import lru_cache
 from typing import Optional
 
 
@@ -89,9 +90,11 @@ def setup_logging(
     return logger
 
 
+@lru_cache(maxsize=None)
 def get_logger(name: str) -> logging.Logger:
     """
-    Get a logger for a specific module.
+    Get a logger for a specific module. The loggers are cached, so repeated
+    calls do not take the lock of the logging module.
 
     Args:
         name: Module name (typically __name__)
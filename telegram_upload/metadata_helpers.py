@@ -44,7 +44,7 @@ def get_video_metadata_stream(metadata: Any) -> Optional[Any]:
             logger.debug("Detected MultipleMetadata (likely MKV file), extracting video stream")
             meta_groups = metadata._MultipleMetadata__groups  # type: ignore
     except (AttributeError, TypeError) as e:
-        logger.debug(f"Could not access metadata groups: {e}")
+        logger.debug("Could not access metadata groups: %s", e)
         return metadata
 
     # If we have multiple streams and the main metadata lacks width,
@@ -60,10 +60,10 @@ def get_video_metadata_stream(metadata: Any) -> Optional[Any]:
                 video_keys = [k for k in meta_groups._key_list if k.startswith('video')]  # type: ignore
                 if video_keys:
                     video_stream = meta_groups[video_keys[0]]  # type: ignore
-                    logger.debug(f"Found video stream: {video_keys[0]}")
+                    logger.debug("Found video stream: %s", video_keys[0])
                     return video_stream
         except (AttributeError, KeyError, IndexError, TypeError) as e:
-            logger.warning(f"Error extracting video stream from metadata: {e}")
+            logger.warning("Error extracting video stream from metadata: %s", e)
             return metadata
 
     return metadata
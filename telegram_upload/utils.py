@@ -1,13 +1,18 @@
 import asyncio
-import itertools
 import os
 import shutil
-from telegram_upload._compat import scandir
+from telegram_upload._compat import scandir, batched
 from telegram_upload.exceptions import TelegramEnvironmentError
 
 
-def free_disk_usage(directory='.'):
-    return shutil.disk_usage(directory)[2]
+if hasattr(os, 'statvfs'):
+    def free_disk_usage(directory='.'):
+        # Same value as shutil.disk_usage().free without building the named tuple
+        stat = os.statvfs(directory)
+        return stat.f_bavail * stat.f_frsize
+else:
+    def free_disk_usage(directory='.'):
+        return shutil.disk_usage(directory)[2]
 
 
 def truncate(text, max_length):
@@ -15,29 +20,33 @@ def truncate(text, max_length):
 
 
 def grouper(n, iterable):
-    it = iter(iterable)
-    while True:
-        chunk = tuple(itertools.islice(it, n))
-        if not chunk:
-            return
-        yield chunk
+    return batched(iterable, n)
+
+
+SIZE_UNITS = ('', 'Ki', 'Mi', 'Gi', 'Ti', 'Pi', 'Ei', 'Zi', 'Yi')
 
 
 def sizeof_fmt(num, suffix='B'):
-    for unit in ['','Ki','Mi','Gi','Ti','Pi','Ei','Zi']:
-        if abs(num) < 1024.0:
-            return "%3.1f%s%s" % (num, unit, suffix)
-        num /= 1024.0
-    return "%.1f%s%s" % (num, 'Yi', suffix)
+    # Every unit is 1024 (2 ** 10) times the previous one
+    unit_index = min(max(int(abs(num)).bit_length() - 1, 0) // 10, len(SIZE_UNITS) - 1)
+    return "%3.1f%s%s" % (num / (1 << (unit_index * 10)), SIZE_UNITS[unit_index], suffix)
 
 
 def scantree(path, follow_symlinks=False):
-    """Recursively yield DirEntry objects for given directory."""
-    for entry in scandir(path):
-        if entry.is_dir(follow_symlinks=follow_symlinks):
-            yield from scantree(entry.path, follow_symlinks)  # see below for Python 2.x
-        else:
+    """Recursively yield DirEntry objects for given directory.
+
+    The directories are walked using a stack of iterators instead of recursion, so deep
+    trees do not reach the recursion limit. The entries are yielded in the same order.
+    """
+    stack = [iter(scandir(path))]
+    while stack:
+        for entry in stack[-1]:
+            if entry.is_dir(follow_symlinks=follow_symlinks):
+                stack.append(iter(scandir(entry.path)))
+                break
             yield entry
+        else:
+            stack.pop()
 
 
 def async_to_sync(coro):
@@ -48,29 +57,30 @@ def async_to_sync(coro):
     For proper handling of nested event loops, consider using asyncio.run()
     or running in a separate thread.
     """
-    try:
-        # Check if there's already a running event loop
-        asyncio.get_running_loop()
-    except RuntimeError:
+    # Check if there's already a running event loop. Unlike get_running_loop(),
+    # _get_running_loop() returns None instead of raising an exception.
+    if asyncio._get_running_loop() is None:
         # No running loop, safe to use asyncio.run()
         return asyncio.run(coro)
-    else:
-        # If we get here, we're already in an async context
-        raise RuntimeError(
-            "async_to_sync() cannot be called from a running event loop. "
-            "Use 'await' instead or run in a separate thread."
-        )
+    # If we get here, we're already in an async context
+    raise RuntimeError(
+        "async_to_sync() cannot be called from a running event loop. "
+        "Use 'await' instead or run in a separate thread."
+    )
 
 
 async def aislice(iterator, limit):
-    items = []
+    if limit <= 0:
+        return []
+    items = [None] * limit
     i = 0
     async for value in iterator:
-        if i >= limit:
-            break
+        items[i] = value
         i += 1
-        items.append(value)
-    return items
+        if i >= limit:
+            # Return without requesting another value, it would be lost for the next call
+            return items
+    return items[:i]
 
 
 async def amap(fn, iterator):
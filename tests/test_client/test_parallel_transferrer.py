@@ -0,0 +1,102 @@
+from unittest.mock import patch, Mock, MagicMock
+
+from telethon.errors import RPCError
+from telethon.tl import functions
+
+from telegram_upload.client.parallel_transferrer import ParallelTransferrer, SenderPool
+
+
+try:
+    from unittest.mock import AsyncMock
+    from unittest import IsolatedAsyncioTestCase
+except ImportError:
+    from asyncmock import AsyncMock
+    from async_case import IsolatedAsyncioTestCase
+
+
+class TestSenderPool(IsolatedAsyncioTestCase):
+    def test_acquire(self):
+        connected = Mock(**{'is_connected.return_value': True})
+        disconnected = Mock(**{'is_connected.return_value': False})
+        pool = SenderPool()
+        pool.release(2, [connected, disconnected, connected])
+        self.assertEqual(pool.acquire(2, 2), [connected, connected])
+        self.assertEqual(pool.acquire(2, 2), [])
+        self.assertEqual(pool.acquire(1, 2), [])
+
+    async def test_close(self):
+        client = AsyncMock()
+        sender = MagicMock()
+        sender.disconnect = AsyncMock()
+        pool = SenderPool()
+        pool.release(2, [sender])
+        await pool.close(client)
+        sender.disconnect.assert_called_once_with()
+        request = client.call_args[0][0]
+        self.assertIsInstance(request, functions.DestroySessionRequest)
+        self.assertEqual(request.session_id, sender._state.id)
+        self.assertEqual(pool.senders, {})
+
+
+class TestParallelTransferrer(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.client = AsyncMock()
+        self.client._sender = Mock()
+        self.client._connection = Mock()
+        self.client._init_request = MagicMock()
+        self.client.session.dc_id = 2
+        self.pool = SenderPool()
+
+    @patch('telegram_upload.client.parallel_transferrer.MTProtoSender')
+    async def test_init_upload(self, mock_sender: MagicMock):
+        mock_sender.return_value.connect = AsyncMock()
+        mock_sender.return_value.send = AsyncMock()
+        transferrer = ParallelTransferrer(self.client, 3, self.pool)
+        senders = await transferrer.init_upload()
+        self.assertEqual(senders, [self.client._sender, mock_sender.return_value, mock_sender.return_value])
+        self.assertEqual(mock_sender.call_count, 2)
+        mock_sender.assert_called_with(self.client.session.auth_key, loggers=self.client._log)
+
+    @patch('telegram_upload.client.parallel_transferrer.MTProtoSender')
+    async def test_init_upload_refused(self, mock_sender: MagicMock):
+        mock_sender.return_value.connect = AsyncMock(side_effect=[None, ConnectionError])
+        mock_sender.return_value.send = AsyncMock()
+        transferrer = ParallelTransferrer(self.client, 4, self.pool)
+        senders = await transferrer.init_upload()
+        self.assertEqual(len(senders), 2)
+
+    @patch('telegram_upload.client.parallel_transferrer.MTProtoSender')
+    async def test_init_upload_init_connection_error(self, mock_sender: MagicMock):
+        mock_sender.return_value.connect = AsyncMock()
+        mock_sender.return_value.send = AsyncMock(side_effect=RPCError(None, 'CONNECTION_LAYER_INVALID'))
+        mock_sender.return_value.disconnect = AsyncMock()
+        transferrer = ParallelTransferrer(self.client, 2, self.pool)
+        senders = await transferrer.init_upload()
+        self.assertEqual(senders, [self.client._sender])
+        mock_sender.return_value.disconnect.assert_called_once_with()
+
+    @patch('telegram_upload.client.parallel_transferrer.MTProtoSender')
+    async def test_init_upload_pool(self, mock_sender: MagicMock):
+        mock_sender.return_value.connect = AsyncMock()
+        mock_sender.return_value.send = AsyncMock()
+        pooled = Mock(**{'is_connected.return_value': True})
+        self.pool.release(2, [pooled])
+        transferrer = ParallelTransferrer(self.client, 3, self.pool)
+        senders = await transferrer.init_upload()
+        self.assertEqual(senders, [self.client._sender, pooled, mock_sender.return_value])
+        self.assertEqual(mock_sender.call_count, 1)
+
+    async def test_single_sender(self):
+        transferrer = ParallelTransferrer(self.client, 1, self.pool)
+        self.assertEqual(await transferrer.init_upload(), [self.client._sender])
+
+    def test_close(self):
+        sender = MagicMock()
+        transferrer = ParallelTransferrer(self.client, 2, self.pool)
+        transferrer.dc_id = 2
+        transferrer.senders.append(sender)
+        transferrer.extra_senders.append(sender)
+        transferrer.close()
+        sender.disconnect.assert_not_called()
+        self.assertEqual(self.pool.senders, {2: [sender]})
+        self.assertEqual(transferrer.senders, [self.client._sender])
@@ -1,3 +1,5 @@
+import asyncio
+import hashlib
 import json
 import os
 import sys
@@ -6,6 +8,7 @@ import unittest
 from unittest.mock import patch, mock_open, Mock, MagicMock, call
 
 from telethon import types
+from telethon.crypto import AES
 from telethon.errors import FloodWaitError, RPCError
 
 from telegram_upload.client.telegram_upload_client import TelegramUploadClient
@@ -39,6 +42,9 @@ class TestTelegramUploadClient(IsolatedAsyncioTestCase):
         self.client = TelegramUploadClient(Mock(), Mock(), Mock())
         self.client.send_file = Mock()
         self.client.send_file.return_value.media.document.size = os.path.getsize(self.upload_file_path)
+        self.client._log = MagicMock()
+        self.client._call = AsyncMock(return_value=True)
+        self.client._sender = MagicMock()
 
     @patch("telegram_upload.client.telegram_upload_client.TelegramUploadClient.forward_messages")
     def test_forward_to(self, mock_forward_messages: MagicMock):
@@ -169,3 +175,93 @@ class TestTelegramUploadClient(IsolatedAsyncioTestCase):
                    side_effect=lambda obj, target: isinstance_result.get(target, isinstance(obj, target))), \
                 self.subTest("Test Document"):
             await self.client._send_media(entity, file, mock_progress)
+
+    async def test_upload_file(self):
+        with open(self.upload_file_path, 'rb') as file:
+            data = file.read()
+        input_file = await self.client.upload_file(self.upload_file_path, part_size_kb=16)
+        self.assertIsInstance(input_file, types.InputFile)
+        self.assertEqual(input_file.md5_checksum, hashlib.md5(data).hexdigest())
+        self.assertEqual(input_file.size, len(data))
+        requests = [c.args[1] for c in self.client._call.call_args_list]
+        self.assertEqual(len(requests), input_file.parts)
+        self.assertEqual(b''.join(r.bytes for r in sorted(requests, key=lambda r: r.file_part)), data)
+
+    async def test_upload_file_parallel_limit(self):
+        sending = []
+        max_sending = []
+
+        async def call(sender, request, ordered=False):
+            sending.append(request)
+            max_sending.append(len(sending))
+            await asyncio.sleep(0)
+            sending.remove(request)
+            return True
+
+        self.client._call = call
+        self.client.upload_semaphore = asyncio.Semaphore(2)
+        await self.client.upload_file(self.upload_file_path, part_size_kb=4)
+        self.assertLessEqual(max(max_sending), 2)
+        self.assertEqual(self.client.upload_semaphore._value, 2)
+
+    async def test_upload_file_encrypted(self):
+        key, iv = b'k' * 32, b'i' * 32
+        with open(self.upload_file_path, 'rb') as file:
+            data = file.read()
+        await self.client.upload_file(self.upload_file_path, part_size_kb=16, key=key, iv=iv)
+        requests = sorted([c.args[1] for c in self.client._call.call_args_list], key=lambda r: r.file_part)
+        part_size = 16 * 1024
+        self.assertEqual(requests[0].bytes, AES.encrypt_ige(data[:part_size], key, iv))
+
+    async def test_upload_file_wrong_size(self):
+        with open(self.upload_file_path, 'rb') as file:
+            file_size = os.path.getsize(self.upload_file_path) * 2
+            with self.assertRaises(ValueError):
+                await self.client.upload_file(file, part_size_kb=16, file_size=file_size)
+        self.assertEqual(self.client.upload_semaphore._value, self.client.parallel_upload_blocks)
+
+    async def test_upload_file_error(self):
+        self.client._call = AsyncMock(side_effect=[True, RPCError(None, 'FILE_PART_INVALID'), True, True])
+        self.client.upload_semaphore = asyncio.Semaphore(2)
+        with self.assertRaises(RPCError):
+            await self.client.upload_file(self.upload_file_path, part_size_kb=4)
+        self.assertEqual(self.client.upload_semaphore._value, 2)
+
+    async def test_upload_file_skip_md5(self):
+        with patch('telegram_upload.client.telegram_upload_client.hashlib.md5') as mock_md5:
+            input_file = await self.client.upload_file(self.upload_file_path, part_size_kb=16, skip_md5=True)
+        mock_md5.return_value.update.assert_not_called()
+        self.assertEqual(input_file.md5_checksum, '')
+
+    @patch('telegram_upload.client.telegram_upload_client.MD5_BLOCK_SIZE', 32 * 1024)
+    async def test_upload_file_md5_blocks(self):
+        with open(self.upload_file_path, 'rb') as file:
+            data = file.read()
+        input_file = await self.client.upload_file(self.upload_file_path, part_size_kb=8)
+        self.assertEqual(input_file.md5_checksum, hashlib.md5(data).hexdigest())
+
+    @patch('telegram_upload.client.telegram_upload_client.ParallelTransferrer')
+    async def test_upload_file_senders(self, mock_transferrer: MagicMock):
+        senders = [MagicMock(), MagicMock()]
+        mock_transferrer.return_value.init_upload = AsyncMock(return_value=senders)
+        await self.client.upload_file(self.upload_file_path, part_size_kb=16)
+        used_senders = {id(c.args[0]) for c in self.client._call.call_args_list}
+        self.assertEqual(used_senders, {id(sender) for sender in senders})
+        mock_transferrer.return_value.close.assert_called_once_with()
+
+    @patch('telegram_upload.client.telegram_upload_client.ParallelTransferrer')
+    async def test_upload_file_sender_disconnected(self, mock_transferrer: MagicMock):
+        disconnected = Mock(**{'is_connected.return_value': False})
+        mock_transferrer.return_value.init_upload = AsyncMock(return_value=[self.client._sender, disconnected])
+        await self.client.upload_file(self.upload_file_path, part_size_kb=16)
+        used_senders = {id(c.args[0]) for c in self.client._call.call_args_list}
+        self.assertEqual(used_senders, {id(self.client._sender)})
+
+    @patch('telegram_upload.client.telegram_upload_client.TelegramClient._disconnect_coro')
+    async def test_disconnect(self, mock_disconnect_coro: MagicMock):
+        self.client.session = MagicMock()
+        self.client.upload_sender_pool = MagicMock()
+        self.client.upload_sender_pool.close = AsyncMock()
+        await self.client._disconnect_coro()
+        self.client.upload_sender_pool.close.assert_called_once_with(self.client)
+        mock_disconnect_coro.assert_called_once_with()
@@ -0,0 +1,86 @@
+import unittest
+from unittest.mock import Mock
+
+from telegram_upload.metadata_helpers import get_video_metadata_stream, metadata_get, metadata_has
+
+
+class Metadata:
+    def __init__(self, **values):
+        self.values = values
+
+    def has(self, key):
+        return key in self.values
+
+    def get(self, key):
+        return self.values[key]
+
+
+class Groups(dict):
+    @property
+    def _key_list(self):
+        return list(self)
+
+
+class MultipleMetadata(Metadata):
+    def __init__(self, groups, **values):
+        super().__init__(**values)
+        self.__groups = groups
+
+
+class TestGetVideoMetadataStream(unittest.TestCase):
+    def test_none(self):
+        self.assertIsNone(get_video_metadata_stream(None))
+
+    def test_simple_metadata(self):
+        metadata = Metadata(width=1920)
+        self.assertIs(get_video_metadata_stream(metadata), metadata)
+
+    def test_multiple_metadata(self):
+        video = Metadata(width=1920)
+        metadata = MultipleMetadata(Groups(audio=Metadata(), video=video))
+        self.assertIs(get_video_metadata_stream(metadata), video)
+
+    def test_multiple_metadata_with_width(self):
+        metadata = MultipleMetadata(Groups(video=Metadata(width=1280)), width=1920)
+        self.assertIs(get_video_metadata_stream(metadata), metadata)
+
+    def test_multiple_metadata_without_video(self):
+        metadata = MultipleMetadata(Groups(audio=Metadata()))
+        self.assertIs(get_video_metadata_stream(metadata), metadata)
+
+    def test_groups_by_instance(self):
+        """The groups are looked up in each metadata object, not once per type."""
+        metadata = Metadata()
+        self.assertIs(get_video_metadata_stream(metadata), metadata)
+        video = Metadata(width=1920)
+        metadata._MultipleMetadata__groups = Groups(video=video)
+        self.assertIs(get_video_metadata_stream(metadata), video)
+
+
+class TestMetadataHas(unittest.TestCase):
+    def test_has(self):
+        self.assertTrue(metadata_has(Metadata(width=1920), 'width'))
+        self.assertFalse(metadata_has(Metadata(), 'width'))
+
+    def test_none(self):
+        self.assertFalse(metadata_has(None, 'width'))
+
+    def test_without_has(self):
+        self.assertFalse(metadata_has(object(), 'width'))
+
+    def test_has_error(self):
+        self.assertFalse(metadata_has(Mock(**{'has.side_effect': TypeError}), 'width'))
+
+
+class TestMetadataGet(unittest.TestCase):
+    def test_get(self):
+        self.assertEqual(metadata_get(Metadata(width=1920), 'width'), 1920)
+
+    def test_default(self):
+        self.assertEqual(metadata_get(Metadata(), 'width', 0), 0)
+        self.assertEqual(metadata_get(None, 'width', 0), 0)
+        self.assertEqual(metadata_get(object(), 'width', 0), 0)
+
+    def test_get_error(self):
+        metadata = Mock(**{'has.return_value': True, 'get.side_effect': KeyError})
+        self.assertEqual(metadata_get(metadata, 'width', 0), 0)
@@ -1,7 +1,10 @@
+import asyncio
+import shutil
 import unittest
 from unittest.mock import patch, Mock
 
-from telegram_upload.utils import sizeof_fmt, scantree
+from telegram_upload.utils import sizeof_fmt, scantree, grouper, async_to_sync, aislice, sync_to_async_iterator, \
+    free_disk_usage
 
 
 class TestSizeOfFmt(unittest.TestCase):
@@ -14,6 +17,26 @@ class TestSizeOfFmt(unittest.TestCase):
     def test_exact_mebibytes(self):
         self.assertEqual(sizeof_fmt((1024 ** 2) * 3), '3.0MiB')
 
+    def test_zero(self):
+        self.assertEqual(sizeof_fmt(0), '0.0B')
+
+    def test_below_unit(self):
+        self.assertEqual(sizeof_fmt(512), '512.0B')
+
+    def test_negative(self):
+        self.assertEqual(sizeof_fmt(-2048), '-2.0KiB')
+
+    def test_yobibytes(self):
+        self.assertEqual(sizeof_fmt(1024 ** 9), '1024.0YiB')
+
+
+class TestGrouper(unittest.TestCase):
+    def test_grouper(self):
+        self.assertEqual(list(grouper(2, range(5))), [(0, 1), (2, 3), (4,)])
+
+    def test_empty(self):
+        self.assertEqual(list(grouper(2, [])), [])
+
 
 class TestScanTree(unittest.TestCase):
     @patch('telegram_upload.utils.scandir', return_value=[])
@@ -36,3 +59,64 @@ class TestScanTree(unittest.TestCase):
         side_effect = [[directory], [file] * 3]
         m.side_effect = side_effect
         self.assertEqual(list(scantree('foo')), side_effect[-1])
+
+    @patch('telegram_upload.utils.scandir')
+    def test_order(self, m):
+        def entry(name, is_dir=False):
+            entry = Mock(path=name)
+            entry.is_dir.return_value = is_dir
+            return entry
+        files = [entry('a'), entry('b/c'), entry('b/d/e'), entry('b/f'), entry('g')]
+        tree = {
+            'foo': [files[0], entry('b', True), files[4]],
+            'b': [files[1], entry('b/d', True), files[3]],
+            'b/d': [files[2]],
+        }
+        m.side_effect = lambda path: tree[path]
+        self.assertEqual(list(scantree('foo')), files)
+
+    @patch('telegram_upload.utils.scandir')
+    def test_deep_directory(self, m):
+        directory = Mock(path='directory')
+        directory.is_dir.return_value = True
+        file = Mock()
+        file.is_dir.return_value = False
+        m.side_effect = [[directory]] * 5000 + [[file]]
+        self.assertEqual(list(scantree('foo')), [file])
+
+
+class TestAsyncToSync(unittest.TestCase):
+    def test_async_to_sync(self):
+        async def coro():
+            return 'foo'
+        self.assertEqual(async_to_sync(coro()), 'foo')
+
+    def test_running_loop(self):
+        async def inner():
+            return 'foo'
+
+        async def outer():
+            coro = inner()
+            try:
+                async_to_sync(coro)
+            finally:
+                coro.close()
+        with self.assertRaises(RuntimeError):
+            asyncio.run(outer())
+
+
+class TestAislice(unittest.TestCase):
+    def test_limit(self):
+        async def pages():
+            iterator = sync_to_async_iterator(iter(range(5)))
+            return [await aislice(iterator, 2) for _ in range(4)]
+        self.assertEqual(asyncio.run(pages()), [[0, 1], [2, 3], [4], []])
+
+    def test_zero_limit(self):
+        self.assertEqual(asyncio.run(aislice(sync_to_async_iterator(range(5)), 0)), [])
+
+
+class TestFreeDiskUsage(unittest.TestCase):
+    def test_free_disk_usage(self):
+        # The free space can change between both calls
+        self.assertAlmostEqual(free_disk_usage('.'), shutil.disk_usage('.').free, delta=64 * 1024 * 1024)